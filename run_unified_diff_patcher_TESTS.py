@@ -6,8 +6,10 @@ This script creates a test environment for unified_diff_patcher.py and verifies
 that the patch application logic works correctly.
 
 Steps:
-1. Creates a subfolder "patch_test_env" in the current directory.
-2. Generates sample original files and unified diff patches.
+1. Creates a subfolder "patch_test_env" in the current directory, or resets
+   the one left by a previous run (only changed inputs are rewritten).
+2. Generates sample original files and unified diff patches (built once into
+   ".patch_test_cache" and hardlinked into "patch_test_env" on later runs).
 3. Runs unified_diff_patcher.py with:
     - Dry-run mode (optional)
     - Normal mode (optional) 
@@ -20,29 +22,56 @@ Usage:
     python run_patch_tests.py --dry-run-only     # Only run dry-run tests
     python run_patch_tests.py --normal-only      # Only run normal mode tests  
     python run_patch_tests.py --verbose          # Run patcher in verbose mode
+    python run_patch_tests.py --isolated         # Run patcher in a separate process per invocation
+    python run_patch_tests.py --isolated --sequential  # ...one process at a time (for debugging)
+    python run_patch_tests.py --clean            # Rebuild patch_test_env from scratch
 
 Prerequisites:
-- Python 3
+- Python 3.11+
 - unified_diff_patcher.py must be in the same directory as this script.
 
 Author: ChatGPT (Enhanced by Claude)
 """
 
+import contextlib
+import functools
+import hashlib
+import importlib.util
+import io
 import os
+import re
+import shutil
 import subprocess
 import sys
+import traceback
+from pathlib import Path
 
 BASE_DIR = os.getcwd()
 TEST_DIR = os.path.join(BASE_DIR, "patch_test_env")
 PATCHER_SCRIPT = os.path.join(BASE_DIR, "unified_diff_patcher.py")
+# Prebuilt copies of the test inputs, hardlinked into TEST_DIR on each run
+TEMPLATE_CACHE_DIR = os.path.join(BASE_DIR, ".patch_test_cache")
+
+def load_patcher():
+    """Import unified_diff_patcher.py as a module so it can be run in-process."""
+    spec = importlib.util.spec_from_file_location("unified_diff_patcher", PATCHER_SCRIPT)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+# Loaded once at import time; None if the script is missing (main() reports that)
+PATCHER = load_patcher() if os.path.exists(PATCHER_SCRIPT) else None
 
 # Test files and expected behavior - now with explicit line ending handling
+# Each test is (name, source, content, patch, expected). File data is bytes so
+# it is written and compared exactly as given, with no encoding at run time.
+# An expected of None means the patcher must reject the file and write no output.
 TESTS = [
-    {
-        "name": "Simple Add Line (Windows CRLF)",
-        "source": "file1.txt",
-        "content": "Line 1\r\nLine 2\r\nLine 3\r\n",  # Windows line endings
-        "patch": """--- a/file1.txt
+    (
+        "Simple Add Line (Windows CRLF)",
+        "file1.txt",
+        b"Line 1\r\nLine 2\r\nLine 3\r\n",  # Windows line endings
+        b"""--- a/file1.txt
 +++ b/file1.txt
 @@ -1,3 +1,4 @@
  Line 1
@@ -50,13 +79,13 @@ TESTS = [
  Line 3
 +Line 4
 """,
-        "expected": "Line 1\r\nLine 2\r\nLine 3\r\nLine 4\r\n"  # Should preserve Windows endings
-    },
-    {
-        "name": "Replace Middle Line (Unix LF)",
-        "source": "file2.txt", 
-        "content": "Alpha\nBeta\nGamma\n",  # Unix line endings
-        "patch": """--- a/file2.txt
+        b"Line 1\r\nLine 2\r\nLine 3\r\nLine 4\r\n",  # Should preserve Windows endings
+    ),
+    (
+        "Replace Middle Line (Unix LF)",
+        "file2.txt",
+        b"Alpha\nBeta\nGamma\n",  # Unix line endings
+        b"""--- a/file2.txt
 +++ b/file2.txt
 @@ -1,3 +1,3 @@
  Alpha
@@ -64,26 +93,26 @@ TESTS = [
 +Delta
  Gamma
 """,
-        "expected": "Alpha\nDelta\nGamma\n"  # Should preserve Unix endings
-    },
-    {
-        "name": "Delete a Line (Windows CRLF)",
-        "source": "file3.txt",
-        "content": "One\r\nTwo\r\nThree\r\nFour\r\n",  # Windows line endings
-        "patch": """--- a/file3.txt
+        b"Alpha\nDelta\nGamma\n",  # Should preserve Unix endings
+    ),
+    (
+        "Delete a Line (Windows CRLF)",
+        "file3.txt",
+        b"One\r\nTwo\r\nThree\r\nFour\r\n",  # Windows line endings
+        b"""--- a/file3.txt
 +++ b/file3.txt
 @@ -2,3 +2,2 @@
  Two
 -Three
  Four
 """,
-        "expected": "One\r\nTwo\r\nFour\r\n"  # Should preserve Windows endings
-    },
-    {
-        "name": "Add Line at Beginning",
-        "source": "file4.txt", 
-        "content": "Second\nThird\nFourth\n",
-        "patch": """--- a/file4.txt
+        b"One\r\nTwo\r\nFour\r\n",  # Should preserve Windows endings
+    ),
+    (
+        "Add Line at Beginning",
+        "file4.txt",
+        b"Second\nThird\nFourth\n",
+        b"""--- a/file4.txt
 +++ b/file4.txt
 @@ -1,3 +1,4 @@
 +First
@@ -91,13 +120,13 @@ TESTS = [
  Third
  Fourth
 """,
-        "expected": "First\nSecond\nThird\nFourth\n"
-    },
-    {
-        "name": "Add Multiple Lines in Middle",
-        "source": "file5.txt",
-        "content": "Start\nEnd\n",
-        "patch": """--- a/file5.txt
+        b"First\nSecond\nThird\nFourth\n",
+    ),
+    (
+        "Add Multiple Lines in Middle",
+        "file5.txt",
+        b"Start\nEnd\n",
+        b"""--- a/file5.txt
 +++ b/file5.txt
 @@ -1,2 +1,4 @@
  Start
@@ -105,13 +134,13 @@ TESTS = [
 +Middle2
  End
 """,
-        "expected": "Start\nMiddle1\nMiddle2\nEnd\n"
-    },
-    {
-        "name": "Multiple Hunks Same File (Unix LF)",
-        "source": "file6.txt",
-        "content": "A\nB\nC\nD\nE\nF\n",  # Unix line endings
-        "patch": """--- a/file6.txt
+        b"Start\nMiddle1\nMiddle2\nEnd\n",
+    ),
+    (
+        "Multiple Hunks Same File (Unix LF)",
+        "file6.txt",
+        b"A\nB\nC\nD\nE\nF\n",  # Unix line endings
+        b"""--- a/file6.txt
 +++ b/file6.txt
 @@ -1,2 +1,2 @@
 -A
@@ -122,88 +151,88 @@ TESTS = [
 -F
 +FF
 """,
-        "expected": "AA\nB\nC\nD\nE\nFF\n"  # Should preserve Unix endings
-    },
-    {
-        "name": "Delete First Line",
-        "source": "file7.txt",
-        "content": "Remove\nKeep1\nKeep2\n",
-        "patch": """--- a/file7.txt
+        b"AA\nB\nC\nD\nE\nFF\n",  # Should preserve Unix endings
+    ),
+    (
+        "Delete First Line",
+        "file7.txt",
+        b"Remove\nKeep1\nKeep2\n",
+        b"""--- a/file7.txt
 +++ b/file7.txt
 @@ -1,3 +1,2 @@
 -Remove
  Keep1
  Keep2
 """,
-        "expected": "Keep1\nKeep2\n"
-    },
-    {
-        "name": "Delete Last Line", 
-        "source": "file8.txt",
-        "content": "Keep1\nKeep2\nRemove\n",
-        "patch": """--- a/file8.txt
+        b"Keep1\nKeep2\n",
+    ),
+    (
+        "Delete Last Line",
+        "file8.txt",
+        b"Keep1\nKeep2\nRemove\n",
+        b"""--- a/file8.txt
 +++ b/file8.txt
 @@ -1,3 +1,2 @@
  Keep1
  Keep2
 -Remove
 """,
-        "expected": "Keep1\nKeep2\n"
-    },
-    {
-        "name": "Single Line File Replacement",
-        "source": "file9.txt",
-        "content": "Original\n",
-        "patch": """--- a/file9.txt
+        b"Keep1\nKeep2\n",
+    ),
+    (
+        "Single Line File Replacement",
+        "file9.txt",
+        b"Original\n",
+        b"""--- a/file9.txt
 +++ b/file9.txt
 @@ -1 +1 @@
 -Original
 +Replaced
 """,
-        "expected": "Replaced\n"
-    },
-    {
-        "name": "Empty File to Content",
-        "source": "file10.txt",
-        "content": "",
-        "patch": """--- a/file10.txt
+        b"Replaced\n",
+    ),
+    (
+        "Empty File to Content",
+        "file10.txt",
+        b"",
+        b"""--- a/file10.txt
 +++ b/file10.txt
 @@ -0,0 +1,2 @@
 +First line
 +Second line
 """,
-        "expected": "First line\r\nSecond line\r\n"  # Should use system default (Windows CRLF)
-    },
-    {
-        "name": "Content to Empty File",
-        "source": "file11.txt", 
-        "content": "Delete me\nDelete me too\n",
-        "patch": """--- a/file11.txt
+        b"First line\r\nSecond line\r\n",  # Should use system default (Windows CRLF)
+    ),
+    (
+        "Content to Empty File",
+        "file11.txt",
+        b"Delete me\nDelete me too\n",
+        b"""--- a/file11.txt
 +++ b/file11.txt
 @@ -1,2 +0,0 @@
 -Delete me
 -Delete me too
 """,
-        "expected": ""
-    },
-    {
-        "name": "No Newline at EOF (Original)",
-        "source": "file12.txt",
-        "content": "Line1\nLine2",  # No trailing newline
-        "patch": """--- a/file12.txt
+        b"",
+    ),
+    (
+        "No Newline at EOF (Original)",
+        "file12.txt",
+        b"Line1\nLine2",  # No trailing newline
+        b"""--- a/file12.txt
 +++ b/file12.txt
 @@ -1,2 +1,3 @@
  Line1
  Line2
 +Line3
 """,
-        "expected": "Line1\nLine2\nLine3\n"
-    },
-    {
-        "name": "Complex Mixed Operations",
-        "source": "file13.txt",
-        "content": "Keep1\nReplace1\nDelete1\nDelete2\nKeep2\nReplace2\nKeep3\n",
-        "patch": """--- a/file13.txt
+        b"Line1\nLine2\nLine3\n",
+    ),
+    (
+        "Complex Mixed Operations",
+        "file13.txt",
+        b"Keep1\nReplace1\nDelete1\nDelete2\nKeep2\nReplace2\nKeep3\n",
+        b"""--- a/file13.txt
 +++ b/file13.txt
 @@ -1,7 +1,6 @@
  Keep1
@@ -217,13 +246,13 @@ TESTS = [
 +NewReplace2
  Keep3
 """,
-        "expected": "Keep1\nNewReplace1\nAddedLine\nKeep2\nNewReplace2\nKeep3\n"
-    },
-    {
-        "name": "Whitespace Only Changes",
-        "source": "file14.txt",
-        "content": "Line with spaces   \nLine with tabs\t\t\nNormal line\n",
-        "patch": """--- a/file14.txt
+        b"Keep1\nNewReplace1\nAddedLine\nKeep2\nNewReplace2\nKeep3\n",
+    ),
+    (
+        "Whitespace Only Changes",
+        "file14.txt",
+        b"Line with spaces   \nLine with tabs\t\t\nNormal line\n",
+        b"""--- a/file14.txt
 +++ b/file14.txt
 @@ -1,3 +1,3 @@
 -Line with spaces   
@@ -232,13 +261,13 @@ TESTS = [
 +Line with tabs\t
  Normal line
 """,
-        "expected": "Line with spaces\nLine with tabs\t\nNormal line\n"
-    },
-    {
-        "name": "Large Context Hunk",
-        "source": "file15.txt",
-        "content": "Context1\nContext2\nContext3\nOldLine\nContext4\nContext5\nContext6\n",
-        "patch": """--- a/file15.txt
+        b"Line with spaces\nLine with tabs\t\nNormal line\n",
+    ),
+    (
+        "Large Context Hunk",
+        "file15.txt",
+        b"Context1\nContext2\nContext3\nOldLine\nContext4\nContext5\nContext6\n",
+        b"""--- a/file15.txt
 +++ b/file15.txt
 @@ -1,7 +1,7 @@
  Context1
@@ -250,13 +279,13 @@ TESTS = [
  Context5
  Context6
 """,
-        "expected": "Context1\nContext2\nContext3\nNewLine\nContext4\nContext5\nContext6\n"
-    },
-    {
-        "name": "Mixed Line Endings (CRLF dominant)",
-        "source": "file16.txt",
-        "content": "Line1\r\nLine2\nLine3\r\nLine4\r\n",  # Mixed, but mostly CRLF
-        "patch": """--- a/file16.txt
+        b"Context1\nContext2\nContext3\nNewLine\nContext4\nContext5\nContext6\n",
+    ),
+    (
+        "Mixed Line Endings (CRLF dominant)",
+        "file16.txt",
+        b"Line1\r\nLine2\nLine3\r\nLine4\r\n",  # Mixed, but mostly CRLF
+        b"""--- a/file16.txt
 +++ b/file16.txt
 @@ -2,3 +2,3 @@
  Line2
@@ -264,52 +293,99 @@ TESTS = [
 +ReplacedLine3
  Line4
 """,
-        "expected": "Line1\r\nLine2\r\nReplacedLine3\r\nLine4\r\n"  # Should use dominant CRLF style
-    }
+        b"Line1\r\nLine2\r\nReplacedLine3\r\nLine4\r\n",  # Should use dominant CRLF style
+    ),
+    (
+        "Context Line Differs From Source",
+        "file18.txt",
+        b"a\nb\nc\n",
+        b"""--- a/file18.txt
++++ b/file18.txt
+@@ -1,3 +1,3 @@
+ X
+-b
++B
+ c
+""",
+        b"a\nB\nc\n",  # Context lines are copied from the source, not the patch
+    ),
+    (
+        "Overlapping Hunks Rejected",
+        "file19.txt",
+        b"1\n2\n3\n4\n",
+        b"""--- a/file19.txt
++++ b/file19.txt
+@@ -1,3 +1,3 @@
+ 1
+-2
++two
+ 3
+@@ -2,2 +2,2 @@
+-2
++TWO
+ 3
+""",
+        None,  # Second hunk starts inside the first: the file is rejected, no output
+    ),
+    (
+        "Invalid UTF-8 Bytes Preserved",
+        "file20.txt",
+        b"Caf\xe9 untouched\nkeep\nold\ncaf\xe9 context\n",  # Latin-1 bytes, not valid UTF-8
+        """--- a/file20.txt
++++ b/file20.txt
+@@ -2,3 +2,3 @@
+ keep
+-old
++new
+ caf\u00e9 context
+""".encode("utf-8"),
+        b"Caf\xe9 untouched\nkeep\nnew\ncaf\xe9 context\n",  # Source bytes come through unchanged
+    ),
+    (
+        "Pure Insertion At Start (Windows CRLF)",
+        "file21.txt",
+        b"Line 1\r\nLine 2\r\n",
+        b"""--- a/file21.txt
++++ b/file21.txt
+@@ -0,0 +1 @@
++Header
+""",
+        b"Header\r\nLine 1\r\nLine 2\r\n",  # Source copied unchanged after the new line
+    ),
+    (
+        "Pure Insertion At End (Mac CR)",
+        "file22.txt",
+        b"Line 1\rLine 2\r",
+        b"""--- a/file22.txt
++++ b/file22.txt
+@@ -3,0 +3 @@
++Footer
+""",
+        b"Line 1\rLine 2\rFooter\r",  # New line appended after the unchanged source
+    ),
+    (
+        "Pure Insertion In Middle",
+        "file23.txt",
+        b"One\nTwo\nThree\n",
+        b"""--- a/file23.txt
++++ b/file23.txt
+@@ -2,0 +2 @@
++Middle
+""",
+        b"One\nMiddle\nTwo\nThree\n",  # Not at the start or end: applied line by line instead
+    )
 ]
 
 # Special test case for cross-line-ending scenario (handled separately)
-CROSS_LINE_ENDING_TEST = {
-    "name": "Cross Line Ending Test (Windows source, Unix patch)",
-    "source": "file17.txt",
-    "content": "WindowsLine1\r\nWindowsLine2\r\nWindowsLine3\r\n",  # Windows source
-    "expected": "WindowsLine1\r\nWindowsLine2\r\nUnixPatchAddition\r\nWindowsLine3\r\n"  # Output should be Windows \r\n
-}
-
-def create_test_env():
-    if os.path.exists(TEST_DIR):
-        print(f"Removing old test directory: {TEST_DIR}")
-        for root, dirs, files in os.walk(TEST_DIR, topdown=False):
-            for name in files:
-                os.remove(os.path.join(root, name))
-            for name in dirs:
-                os.rmdir(os.path.join(root, name))
-        os.rmdir(TEST_DIR)
-
-    os.makedirs(TEST_DIR)
-    print(f"Created test environment at {TEST_DIR}")
-
-    # Create source files and patch file
-    for t in TESTS:
-        src_path = os.path.join(TEST_DIR, t["source"])
-        with open(src_path, "w", encoding="utf-8", newline='') as f:
-            f.write(t["content"])
-    
-    # Create the cross-line-ending test source file
-    cross_src_path = os.path.join(TEST_DIR, CROSS_LINE_ENDING_TEST["source"])
-    with open(cross_src_path, "w", encoding="utf-8", newline='') as f:
-        f.write(CROSS_LINE_ENDING_TEST["content"])
+# Laid out as (name, source, content, expected); its patch is CROSS_PATCH_CONTENT
+CROSS_LINE_ENDING_TEST = (
+    "Cross Line Ending Test (Windows source, Unix patch)",
+    "file17.txt",
+    b"WindowsLine1\r\nWindowsLine2\r\nWindowsLine3\r\n",  # Windows source
+    b"WindowsLine1\r\nWindowsLine2\r\nUnixPatchAddition\r\nWindowsLine3\r\n",  # Output should be Windows \r\n
+)
 
-    # Write patch file combining all patches  
-    patch_path = os.path.join(TEST_DIR, "combined.patch")
-    with open(patch_path, "w", encoding="utf-8", newline='') as f:
-        for t in TESTS:
-            f.write(t["patch"])
-            f.write("\n")
-    
-    # Create a special cross-line-ending test patch with explicit Unix line endings
-    cross_patch_path = os.path.join(TEST_DIR, "cross_line_ending.patch")
-    cross_patch_content = """--- a/file17.txt
+CROSS_PATCH_CONTENT = b"""--- a/file17.txt
 +++ b/file17.txt
 @@ -1,3 +1,4 @@
  WindowsLine1
@@ -317,59 +393,246 @@ def create_test_env():
 +UnixPatchAddition
  WindowsLine3
 """
-    # Ensure this patch file has Unix line endings regardless of system
-    cross_patch_unix = cross_patch_content.replace('\r\n', '\n').replace('\r', '\n')
-    with open(cross_patch_path, "w", encoding="utf-8", newline='') as f:
-        f.write(cross_patch_unix)
-    
+
+# Test environment file contents, built once since the tables above are constant
+SOURCE_FILES = {source: content for name, source, content, patch, expected in TESTS}
+SOURCE_FILES[CROSS_LINE_ENDING_TEST[1]] = CROSS_LINE_ENDING_TEST[2]
+COMBINED_PATCH = b"".join(patch + b"\n" for name, source, content, patch, expected in TESTS)
+# Ensure the cross patch has Unix line endings regardless of system
+CROSS_PATCH = CROSS_PATCH_CONTENT.replace(b'\r\n', b'\n').replace(b'\r', b'\n')
+# Digest of each test's expected output, checked before any output is read into memory
+EXPECTED_DIGEST = {name: hashlib.blake2b(expected).digest() for name, source, content, patch, expected in TESTS if expected is not None}
+# Every file in a fresh test environment
+TEST_ENV_FILES = dict(SOURCE_FILES, **{"combined.patch": COMBINED_PATCH, "cross_line_ending.patch": CROSS_PATCH})
+TEST_ENV_DIGEST = {name: hashlib.blake2b(data).digest() for name, data in TEST_ENV_FILES.items()}
+
+def template_dir():
+    """Return the cached template holding TEST_ENV_FILES, building it on first use.
+
+    The directory name is a hash of the file names and contents, so editing
+    the test tables above starts a new template instead of reusing a stale one.
+    """
+    digest = hashlib.sha256()
+    for name, data in sorted(TEST_ENV_FILES.items()):
+        digest.update(f"{name}\0{len(data)}\0".encode("utf-8"))
+        digest.update(data)
+    template = os.path.join(TEMPLATE_CACHE_DIR, f"tests-{digest.hexdigest()[:16]}")
+    if not os.path.isdir(template):
+        # Build under a temporary name so an interrupted run never leaves a partial template
+        staging = template + ".tmp"
+        shutil.rmtree(staging, ignore_errors=True)
+        os.makedirs(staging)
+        for name, data in TEST_ENV_FILES.items():
+            Path(staging, name).write_bytes(data)
+        os.rename(staging, template)
+    return template
+
+def has_test_content(path, name):
+    """Return True if the file at path holds exactly TEST_ENV_FILES[name]."""
+    try:
+        with open(path, "rb") as f:
+            return hashlib.file_digest(f, "blake2b").digest() == TEST_ENV_DIGEST[name]
+    except OSError:
+        return False
+
+def link_from_template(template, name):
+    """Hardlink the template copy of name into TEST_DIR, copying where hardlinks are unsupported.
+
+    Linking is safe because the patcher never modifies its inputs, only
+    creates new numbered output files next to them. A template file that
+    was edited through a link from an earlier run, or deleted, is rewritten first.
+    """
+    src = os.path.join(template, name)
+    if not has_test_content(src, name):
+        # Unlink rather than truncate, in case TEST_DIR still links it (or it may be missing)
+        Path(src).unlink(missing_ok=True)
+        Path(src).write_bytes(TEST_ENV_FILES[name])
+    dst = os.path.join(TEST_DIR, name)
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+
+def refresh_test_env(template):
+    """Reset an existing TEST_DIR to a fresh environment, touching only what differs.
+
+    Leftovers from earlier runs (numbered outputs and anything else not in
+    TEST_ENV_FILES) are removed. Inputs whose content still matches are kept;
+    others are deleted and relinked rather than rewritten in place, since
+    writing through a hardlink would alter the template itself.
+    """
+    with os.scandir(TEST_DIR) as it:
+        entries = list(it)
+    current = set()
+    for entry in entries:
+        if entry.name in TEST_ENV_FILES and entry.is_file(follow_symlinks=False):
+            if has_test_content(entry.path, entry.name):
+                current.add(entry.name)
+                continue
+        if entry.is_dir(follow_symlinks=False):
+            shutil.rmtree(entry.path)
+        else:
+            os.remove(entry.path)
+    for name in TEST_ENV_FILES.keys() - current:
+        link_from_template(template, name)
+
+def create_test_env(clean=False):
+    template = template_dir()
+    if clean or not os.path.isdir(TEST_DIR):
+        if os.path.exists(TEST_DIR):
+            print(f"Removing old test directory: {TEST_DIR}")
+            shutil.rmtree(TEST_DIR)
+        os.makedirs(TEST_DIR)
+        for name in TEST_ENV_FILES:
+            link_from_template(template, name)
+        print(f"Created test environment at {TEST_DIR}")
+    else:
+        refresh_test_env(template)
+        print(f"Reset test environment at {TEST_DIR}")
+
+    patch_path = os.path.join(TEST_DIR, "combined.patch")
+    cross_patch_path = os.path.join(TEST_DIR, "cross_line_ending.patch")
     return patch_path, cross_patch_path
 
-def run_patcher_dry_run(patch_path, verbose=False):
+def invoke_patcher(run, patch_path, dry_run=False):
+    """Call run(patch_path, dry_run=dry_run) in this process, return (returncode, stdout, stderr)."""
+    stdout, stderr = io.StringIO(), io.StringIO()
+    returncode = 0
+    with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr):
+        try:
+            run(patch_path, dry_run=dry_run)
+        except SystemExit as e:
+            # Explicit exits, mirrored as process exit codes
+            returncode = 0 if e.code is None else e.code if isinstance(e.code, int) else 1
+        except Exception:
+            traceback.print_exc()
+            returncode = 1
+    return returncode, stdout.getvalue(), stderr.getvalue()
+
+def spawn_patcher(base_cmd, patch_path, dry_run=False):
+    """Start the patcher script on patch_path in a new interpreter without waiting for it."""
+    cmd = base_cmd + [patch_path, "--dry-run"] if dry_run else base_cmd + [patch_path]
+    # Binary pipes: the output is passed through undecoded by print_output()
+    return subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+
+def make_starter(verbose=False, isolated=False):
+    """Return start(patch_path, dry_run=False), which begins one patcher run and
+    returns a handle for finish_patcher().
+
+    The options that are fixed for the whole harness run are bound here once.
+    By default the patcher's patch_files() runs in this process and has
+    finished when start() returns. With isolated=True a fresh interpreter is
+    spawned instead, for the rare case where a test must not share patcher
+    module state; runs on patches touching disjoint files can then overlap.
+    """
+    if isolated:
+        base_cmd = [sys.executable, PATCHER_SCRIPT, "--base-dir", TEST_DIR]
+        if verbose:
+            base_cmd.append("--verbose")
+        return functools.partial(spawn_patcher, base_cmd)
+    run = functools.partial(PATCHER.patch_files, base_dir=TEST_DIR, verbose=verbose)
+    return functools.partial(invoke_patcher, run)
+
+def finish_patcher(handle):
+    """Wait for a run begun by a make_starter() callable, return (returncode, stdout, stderr).
+
+    stdout and stderr are str for in-process runs and bytes for isolated ones.
+    """
+    if isinstance(handle, subprocess.Popen):
+        stdout, stderr = handle.communicate()
+        return handle.returncode, stdout, stderr
+    return handle
+
+def run_patchers(start, patch_paths, dry_run=False, sequential=False):
+    """Run the patcher via start once per patch in patch_paths, return a list of (returncode, stdout, stderr).
+
+    All runs are started before any is waited on unless sequential is set.
+    """
+    if sequential:
+        return [finish_patcher(start(p, dry_run=dry_run)) for p in patch_paths]
+    handles = [start(p, dry_run=dry_run) for p in patch_paths]
+    return [finish_patcher(h) for h in handles]
+
+def print_output(output):
+    """Print captured patcher output, writing subprocess bytes straight to stdout without decoding."""
+    if isinstance(output, bytes) and hasattr(sys.stdout, "buffer"):
+        sys.stdout.flush()  # keep ordering with text already printed
+        sys.stdout.buffer.write(output + b"\n")
+    elif isinstance(output, bytes):
+        print(output.decode(errors="replace"))
+    else:
+        print(output)
+
+def report_dry_run(result):
+    returncode, stdout, stderr = result
     print("\nRunning patcher (dry-run mode)...")
-    cmd = [sys.executable, PATCHER_SCRIPT, patch_path, "--base-dir", TEST_DIR, "--dry-run"]
-    if verbose:
-        cmd.append("--verbose")
-    result = subprocess.run(cmd, capture_output=True, text=True, check=False)
     print("Dry-run output:")
-    print(result.stdout)
-    if result.stderr:
+    print_output(stdout)
+    if stderr:
         print("Dry-run stderr:")
-        print(result.stderr)
+        print_output(stderr)
 
-def run_patcher(patch_path, verbose=False):
+def report_patcher_run(result):
+    returncode, stdout, stderr = result
     print("\nRunning patcher (normal mode)...")
-    cmd = [sys.executable, PATCHER_SCRIPT, patch_path, "--base-dir", TEST_DIR]
-    if verbose:
-        cmd.append("--verbose")
-    result = subprocess.run(cmd, capture_output=True, text=True, check=False)
     print("Patcher output:")
-    print(result.stdout)
-    if result.stderr:
+    print_output(stdout)
+    if stderr:
         print("Patcher stderr:")
-        print(result.stderr)
-    return result.returncode
+        print_output(stderr)
+    return returncode
+
+def count_line_endings(data):
+    """Return (crlf, lf, cr) line ending counts for raw file bytes.
+
+    Works on bytes so files need not be decoded just to be analyzed; each
+    count is a single C-level scan and lone LF/CR exclude the CRLF pairs.
+    The CRLF scan is skipped when the data lacks either CR or LF, as it
+    does for any single-style Unix or Mac file.
+    """
+    lf = data.count(b'\n')
+    cr = data.count(b'\r')
+    crlf = data.count(b'\r\n') if lf and cr else 0
+    return crlf, lf - crlf, cr - crlf
+
+# Numbered patcher output such as file1.001.txt -> (stem, number, extension)
+NUMBERED_OUTPUT_RE = re.compile(r'(.+)\.(\d{3})(\.[^.]*)?')
+
+def scan_numbered_outputs():
+    """Return {(stem, ext): path} of the first numbered output for each source in TEST_DIR.
+
+    One directory scan is parsed into a table keyed like os.path.splitext(source),
+    so finding a test's output is a single dict lookup. Only numbers 001-049
+    count, and the lowest present wins.
+    """
+    found = {}
+    with os.scandir(TEST_DIR) as it:
+        for entry in it:
+            m = NUMBERED_OUTPUT_RE.fullmatch(entry.name)
+            if m:
+                key, number = (m[1], m[3] or ""), int(m[2])
+                if 1 <= number < 50 and (key not in found or number < found[key][0]):
+                    found[key] = (number, entry.path)
+    return {key: path for key, (number, path) in found.items()}
+
+def find_numbered_output(source, outputs):
+    """Return the path of the first numbered output for source (file.001.txt, ...) or None."""
+    return outputs.get(os.path.splitext(source))
 
 def verify_cross_line_ending_test(test_info):
     """Verify the cross-line-ending test specifically and show detailed analysis."""
-    base = os.path.join(TEST_DIR, test_info["source"])
-    candidate = None
-    for i in range(1, 50):
-        name = f"{os.path.splitext(base)[0]}.{i:03d}{os.path.splitext(base)[1]}"
-        if os.path.exists(name):
-            candidate = name
-            break
+    name, source, content, expected = test_info
+    candidate = find_numbered_output(source, scan_numbered_outputs())
     
     if not candidate:
-        print(f"  FAIL: No output file found for {test_info['source']}")
+        print(f"  FAIL: No output file found for {source}")
         return
     
-    with open(candidate, "r", encoding="utf-8", newline='') as f:
+    with open(candidate, "rb") as f:
         actual = f.read()
     
-    def analyze_endings(s, name):
-        crlf = s.count('\r\n')
-        lf = s.count('\n') - crlf
-        cr = s.count('\r') - crlf
+    def analyze_endings(data, name):
+        crlf, lf, cr = count_line_endings(data)
         print(f"  {name}: CRLF={crlf}, LF={lf}, CR={cr}")
         if crlf > 0:
             return "Windows (\\r\\n)"
@@ -380,61 +643,66 @@ def verify_cross_line_ending_test(test_info):
         else:
             return "No line endings"
     
-    print(f"  Source file: {test_info['source']}")
-    with open(os.path.join(TEST_DIR, test_info["source"]), "r", encoding="utf-8", newline='') as f:
+    print(f"  Source file: {source}")
+    with open(os.path.join(TEST_DIR, source), "rb") as f:
         source_content = f.read()
     source_style = analyze_endings(source_content, "Source")
     
     print(f"  Output file: {candidate}")
     output_style = analyze_endings(actual, "Output")
     
-    expected_style = analyze_endings(test_info["expected"], "Expected")
+    expected_style = analyze_endings(expected, "Expected")
     
-    if actual == test_info["expected"]:
+    if actual == expected:
         print(f"  PASS: Output matches expected content exactly")
         print(f"  SUCCESS: Line ending preservation worked - {source_style} → {output_style}")
     else:
         print(f"  FAIL: Content mismatch")
-        print(f"  Expected: {repr(test_info['expected'][:50])}...")
-        print(f"  Actual:   {repr(actual[:50])}...")
+        print(f"  Expected: {repr(expected.decode('utf-8')[:50])}...")
+        print(f"  Actual:   {repr(actual.decode('utf-8', 'replace')[:50])}...")
 
 def verify_results():
     print("\nVerifying results...")
     results = []
-    for t in TESTS:
-        base = os.path.join(TEST_DIR, t["source"])
-        candidate = None
-        for i in range(1, 50):  # search for numbered output
-            name = f"{os.path.splitext(base)[0]}.{i:03d}{os.path.splitext(base)[1]}"
-            if os.path.exists(name):
-                candidate = name
-                break
+    outputs = scan_numbered_outputs()
+    for name, source, content, patch, expected_bytes in TESTS:
+        candidate = find_numbered_output(source, outputs)
         
-        if candidate:
-            with open(candidate, "r", encoding="utf-8", newline='') as f:
-                actual = f.read()
+        if expected_bytes is None:
+            if candidate:
+                results.append((name, False, f"Expected no output for {source}, found {candidate}"))
+            else:
+                results.append((name, True, None))
+        elif candidate:
+            # For line-ending aware patcher, we expect EXACT matches (no normalization).
+            # Hashing in C decides a pass without loading the output; only a
+            # mismatch reads it back for the detailed report.
+            with open(candidate, "rb") as f:
+                matched = hashlib.file_digest(f, "blake2b").digest() == EXPECTED_DIGEST[name]
+                if not matched:
+                    f.seek(0)
+                    actual_bytes = f.read()
             
-            # For line-ending aware patcher, we expect EXACT matches (no normalization)
-            if actual == t["expected"]:
-                results.append((t["name"], True, None))
+            if matched:
+                results.append((name, True, None))
             else:
+                expected = expected_bytes.decode("utf-8", "replace")
+                actual = actual_bytes.decode("utf-8", "replace")
                 # Show the difference for debugging, including line ending details
-                diff_info = f"Expected {len(t['expected'])} chars, got {len(actual)} chars"
-                if len(t['expected']) <= 200 and len(actual) <= 200:
-                    diff_info += f"\nExpected: {repr(t['expected'])}\nActual:   {repr(actual)}"
+                diff_info = f"Expected {len(expected)} chars, got {len(actual)} chars"
+                if len(expected) <= 200 and len(actual) <= 200:
+                    diff_info += f"\nExpected: {repr(expected)}\nActual:   {repr(actual)}"
                 
                 # Also show line ending analysis
-                def analyze_endings(s):
-                    crlf = s.count('\r\n')
-                    lf = s.count('\n') - crlf
-                    cr = s.count('\r') - crlf
+                def analyze_endings(data):
+                    crlf, lf, cr = count_line_endings(data)
                     return f"CRLF:{crlf}, LF:{lf}, CR:{cr}"
                 
-                diff_info += f"\nExpected endings: {analyze_endings(t['expected'])}"
-                diff_info += f"\nActual endings: {analyze_endings(actual)}"
-                results.append((t["name"], False, diff_info))
+                diff_info += f"\nExpected endings: {analyze_endings(expected_bytes)}"
+                diff_info += f"\nActual endings: {analyze_endings(actual_bytes)}"
+                results.append((name, False, diff_info))
         else:
-            results.append((t["name"], False, f"No output file found for {t['source']}"))
+            results.append((name, False, f"No output file found for {source}"))
 
     print("\nTest Results:")
     passed = 0
@@ -456,17 +724,24 @@ def main():
     parser.add_argument('--dry-run-only', action='store_true', help='Only run dry-run tests, do not create output files')
     parser.add_argument('--normal-only', action='store_true', help='Only run normal mode tests, skip dry-run')
     parser.add_argument('--verbose', action='store_true', help='Run patcher in verbose mode')
+    parser.add_argument('--isolated', action='store_true', help='Run each patcher invocation in a separate Python process')
+    parser.add_argument('--sequential', action='store_true', help='With --isolated, wait for each patcher process before starting the next')
+    parser.add_argument('--clean', action='store_true', help='Delete and rebuild the test environment instead of resetting it')
     args = parser.parse_args()
     
     if args.dry_run_only and args.normal_only:
         print("ERROR: Cannot specify both --dry-run-only and --normal-only")
         return
     
-    if not os.path.exists(PATCHER_SCRIPT):
+    if args.sequential and not args.isolated:
+        print("ERROR: --sequential only applies with --isolated")
+        return
+    
+    if PATCHER is None:
         print("ERROR: unified_diff_patcher.py not found in current directory.")
         return
 
-    patch_path, cross_patch_path = create_test_env()
+    patch_path, cross_patch_path = create_test_env(clean=args.clean)
     
     # Determine what modes to run
     run_dry_run = not args.normal_only  # Default True unless --normal-only
@@ -474,13 +749,22 @@ def main():
     
     print(f"\nTest Mode: {'Dry-run only' if args.dry_run_only else 'Normal only' if args.normal_only else 'Both dry-run and normal'}")
     
-    # Run main test suite
+    # The main and cross-line-ending patches touch disjoint files, so each mode
+    # runs both together; dry-runs still finish before normal mode writes output
+    patch_paths = [patch_path, cross_patch_path]
+    start = make_starter(verbose=args.verbose, isolated=args.isolated)
+    if run_dry_run:
+        dry_results = run_patchers(start, patch_paths, dry_run=True, sequential=args.sequential)
+    if run_normal:
+        normal_results = run_patchers(start, patch_paths, sequential=args.sequential)
+    
+    # Report main test suite
     if run_dry_run:
-        run_patcher_dry_run(patch_path, verbose=args.verbose)
+        report_dry_run(dry_results[0])
     
     returncode = 0
     if run_normal:
-        returncode = run_patcher(patch_path, verbose=args.verbose)
+        returncode = report_patcher_run(normal_results[0])
         if returncode != 0:
             print(f"WARNING: Patcher returned non-zero exit code: {returncode}")
     
@@ -491,11 +775,11 @@ def main():
     print("Testing: Windows source file + Unix patch file → Windows output")
     
     if run_dry_run:
-        run_patcher_dry_run(cross_patch_path, verbose=args.verbose)
+        report_dry_run(dry_results[1])
     
     cross_returncode = 0
     if run_normal:
-        cross_returncode = run_patcher(cross_patch_path, verbose=args.verbose)
+        cross_returncode = report_patcher_run(normal_results[1])
     
     # Only verify results if we ran normal mode (created output files)
     if run_normal:
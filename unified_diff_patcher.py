@@ -42,29 +42,77 @@ Author: ChatGPT (Enhanced by Claude)
 import sys
 import os
 import re
+import shutil
 import argparse
+import itertools
 
-def next_numbered_filename(original):
-    """Return next available numbered filename: file.py -> file.001.py, file.002.py, etc."""
+# Compiled once: used for every hunk header in a patch
+_HUNK_RE = re.compile(r'@@ -(\d+),?(\d*) \+(\d+),?(\d*) @@')
+
+# Source files are read, and large outputs written, in blocks of this size
+_IO_BLOCK_SIZE = 1 << 20
+
+def _directory_names(directory, listings):
+    """Return the normcased names in directory (None if it can't be listed), listing it once per run.
+    
+    listings maps each directory asked about to its names and is filled in
+    as new directories come up. A symlink only counts if its target exists,
+    as with os.path.exists().
+    """
+    directory = os.path.normcase(directory)
+    if directory not in listings:
+        try:
+            with os.scandir(directory or '.') as it:
+                listings[directory] = {os.path.normcase(entry.name) for entry in it
+                                       if not entry.is_symlink() or os.path.exists(entry.path)}
+        except OSError:
+            listings[directory] = None
+    return listings[directory]
+
+def next_numbered_filename(original, listings=None):
+    """Return next available numbered filename: file.py -> file.001.py, file.002.py, etc.
+    
+    Numbers already in use are skipped by looking them up in the directory
+    listing (shared across calls through listings, see file_exists()),
+    instead of one os.path.exists() call per number. The free name found is
+    still confirmed with os.path.exists(), since normcase() does not know
+    about case-insensitive filesystems on macOS and other POSIX systems.
+    """
     base, ext = os.path.splitext(original)
+    taken = _directory_names(os.path.dirname(original), {} if listings is None else listings)
+    
     counter = 1
     while True:
         new_name = f"{base}.{counter:03d}{ext}"
-        if not os.path.exists(new_name):
-            return new_name
+        name = os.path.normcase(os.path.basename(new_name))
+        if taken is None or name not in taken:
+            if not os.path.exists(new_name):
+                return new_name
+            if taken is not None:
+                taken.add(name)
         counter += 1
 
-def detect_line_ending(content):
-    """Detect the line ending style used in content. Returns '\r\n', '\n', '\r', or system default."""
-    if not content:
-        return os.linesep  # Use system default for empty content
+def file_exists(path, listings):
+    """Return whether path exists, listing each directory once across calls.
     
-    # Count different line ending types
-    crlf_count = content.count('\r\n')
-    lf_count = content.count('\n') - crlf_count  # Subtract CRLF occurrences to avoid double-counting
-    cr_count = content.count('\r') - crlf_count   # Subtract CRLF occurrences
+    listings maps a directory to the normcased names found in it (None if it
+    could not be listed), so a patch touching many files in one directory
+    costs a single scandir instead of one os.path.exists() call per file.
+    A name missing from the listing is checked with os.path.exists() after
+    all: it may differ only in case on a case-insensitive filesystem that
+    normcase() doesn't know about (macOS, some POSIX mounts).
+    """
+    directory, name = os.path.split(path)
+    names = _directory_names(directory, listings)
+    if names is not None and name and os.path.normcase(name) in names:
+        return True
+    return os.path.exists(path)
+
+def _line_ending_from_counts(crlf_count, lf_count, cr_count):
+    """Return the most common line ending given the count of each (lone LF/CR, not part of a CRLF).
     
-    # Return the most common line ending
+    Ties go to CRLF, then LF, so content with no line endings at all gets CRLF.
+    """
     if crlf_count >= lf_count and crlf_count >= cr_count:
         return '\r\n'
     elif lf_count >= cr_count:
@@ -74,28 +122,69 @@ def detect_line_ending(content):
     else:
         return os.linesep  # Default to system convention
 
-def normalize_line_endings(content, target_ending='\n'):
-    """Convert all line endings in content to target_ending."""
-    # First convert CRLF to LF to avoid double conversion
-    content = content.replace('\r\n', '\n')
-    # Then convert remaining CR to LF
-    content = content.replace('\r', '\n')
-    # Finally convert to target ending if it's not LF
-    if target_ending != '\n':
-        content = content.replace('\n', target_ending)
-    return content
-
-def lines_with_preserved_endings(content, original_ending):
-    """Split content into lines while preserving the original line ending style."""
-    # Normalize to \n for processing
-    normalized = normalize_line_endings(content, '\n')
-    lines = normalized.splitlines(keepends=True)
+def open_source(path):
+    """Open an original file for reading its lines with their line endings untouched.
     
-    # Convert back to original line ending style
-    if original_ending != '\n':
-        lines = [line.replace('\n', original_ending) if line.endswith('\n') else line for line in lines]
+    Bytes that are not valid UTF-8 are decoded as lone surrogates
+    (surrogateescape) rather than failing the patch; open_output() encodes
+    them back to the same bytes.
+    """
+    return open(path, 'r', encoding='utf-8', errors='surrogateescape', newline='', buffering=_IO_BLOCK_SIZE)
+
+def open_output(path):
+    """Create a patched output file for writing lines exactly as given."""
+    return open(path, 'w', encoding='utf-8', errors='surrogateescape', newline='')
+
+def _count_line_endings(f):
+    """Count the line endings in the text file f, opened with newline='', reading it in blocks.
+    
+    Returns (crlf_count, lf_count, cr_count, last): lone LF and CR exclude
+    the CRLF pairs, and last is the final character read ('' if f was empty).
+    """
+    crlf_count = lf_count = cr_count = 0
+    last = ''
+    while block := f.read(_IO_BLOCK_SIZE):
+        block_lf = block.count('\n')
+        block_cr = block.count('\r')
+        # A block with only one of LF and CR (any single-style Unix or Mac
+        # file) can't hold a CRLF, so the third scan is skipped
+        if block_lf and block_cr:
+            crlf_count += block.count('\r\n')
+        if last == '\r' and block[0] == '\n':
+            crlf_count += 1  # CRLF split across two blocks
+        lf_count += block_lf
+        cr_count += block_cr
+        last = block[-1]
+    return crlf_count, lf_count - crlf_count, cr_count - crlf_count, last
+
+def scan_line_endings(path):
+    """Detect a file's line ending style and count its lines without keeping its content.
     
-    return lines
+    The line ending is the most common style (the system default for an
+    empty file) and lines are counted the way they are read with newline='':
+    split at \\r\\n, \\n and \\r, plus a last line without a line ending.
+    Returns (line_ending, line_count, mixed), where mixed means more than
+    one line ending style is present; such a file's lines are normalized
+    to line_ending by lines_with_line_ending().
+    """
+    with open_source(path) as f:
+        crlf_count, lf_count, cr_count, last = _count_line_endings(f)
+    
+    if not last:
+        return os.linesep, 0, False  # Use system default for empty content
+    line_count = crlf_count + lf_count + cr_count + (0 if last in '\r\n' else 1)
+    mixed = (crlf_count > 0) + (lf_count > 0) + (cr_count > 0) > 1
+    return _line_ending_from_counts(crlf_count, lf_count, cr_count), line_count, mixed
+
+def lines_with_line_ending(lines, line_ending):
+    """Yield lines read with newline='' with each line's own terminator replaced by line_ending.
+    
+    Used for a file that mixes line ending styles, so the output uses its
+    most common style throughout.
+    """
+    for line in lines:
+        body = line.rstrip('\r\n')
+        yield body + line_ending if len(body) < len(line) else line
 
 def parse_patch(diff_file):
     """Parse unified diff into a list of file patches.
@@ -103,182 +192,327 @@ def parse_patch(diff_file):
     NOTE: Patch files can have different line endings than the source files.
     We normalize all patch content to \\n for consistent processing, then
     convert output to match each source file's detected line ending style.
-    """
-    with open(diff_file, 'r', encoding='utf-8', newline='') as f:
-        content = f.read()
-    
-    # Detect patch file's line ending for informational purposes
-    patch_line_ending = detect_line_ending(content)
     
-    # Always normalize patch file line endings to \n for consistent processing
-    # This handles cases where patch has different line endings than source files
-    content = normalize_line_endings(content, '\n')
-    lines = content.splitlines(keepends=True)
-
+    The patch is read line by line in universal newlines mode, which does that
+    normalization as it goes, so the whole file is never held in memory.
+    """
     patches = []
     current = None
-    for line in lines:
-        if line.startswith('--- '):
-            if current:
-                patches.append(current)
-            current = {'old': line[4:].strip(), 'new': None, 'hunks': [], 'patch_line_ending': patch_line_ending}
-        elif line.startswith('+++ ') and current:
-            current['new'] = line[4:].strip()
-        elif line.startswith('@@') and current:
-            current['hunks'].append({'header': line, 'lines': []})
-        elif current and current['hunks']:
-            current['hunks'][-1]['lines'].append(line)
+    with open(diff_file, 'r', encoding='utf-8', newline=None) as f:
+        hunk = None  # Last hunk of the current file, which body lines belong to
+        for line in f:
+            # Dispatch on the first character; the header checks keep their original precedence
+            c = line[:1]
+            if c == ' ' and hunk is not None:
+                # Context lines are the most common and never a header, so they are settled first
+                hunk['lines'].append(line)
+                hunk['old_lines'].append(line[1:])
+            elif c == '-' and line.startswith('--- '):
+                if current:
+                    patches.append(current)
+                current = {'old': line[4:].strip(), 'new': None, 'hunks': []}
+                hunk = None
+            elif c == '+' and current and line.startswith('+++ '):
+                current['new'] = line[4:].strip()
+            elif c == '@' and current and line.startswith('@@'):
+                # 'old_lines' collects the context and removed lines: what the hunk expects in the source
+                hunk = {'header': line, 'lines': [], 'old_lines': []}
+                # Parse the header once here; an invalid one is left for apply_hunks() to report
+                if m := _HUNK_RE.match(line):
+                    hunk['old_start'] = int(m[1])
+                    hunk['old_count'] = int(m[2]) if m[2] else 1
+                    hunk['new_start'] = int(m[3])
+                    hunk['new_count'] = int(m[4]) if m[4] else 1
+                current['hunks'].append(hunk)
+            elif hunk is not None:
+                hunk['lines'].append(line)
+                if c == '-':
+                    hunk['old_lines'].append(line[1:])
+        # Every line ending style translated while reading, for informational purposes
+        newlines = f.newlines
 
     if current:
         patches.append(current)
+    
+    # Report the patch file's line ending: the only style it uses, or else the most
+    # common one, counted in a second pass (patches with mixed or no line endings are rare)
+    if isinstance(newlines, str):
+        patch_line_ending = newlines
+    else:
+        with open(diff_file, 'r', encoding='utf-8', newline='') as f:
+            crlf_count, lf_count, cr_count, last = _count_line_endings(f)
+        patch_line_ending = _line_ending_from_counts(crlf_count, lf_count, cr_count) if last else os.linesep
+    for p in patches:
+        p['patch_line_ending'] = patch_line_ending
     return patches
 
+def write_lines(f, lines):
+    """Write lines to the open file f in few write calls, returning the number of lines.
+    
+    lines may be a generator: they are joined and written in _IO_BLOCK_SIZE
+    batches as they arrive, so the whole output is never held at once.
+    """
+    count = 0
+    batch = []
+    batch_size = 0
+    for line in lines:
+        batch.append(line)
+        batch_size += len(line)
+        if batch_size >= _IO_BLOCK_SIZE:
+            f.write(''.join(batch))
+            count += len(batch)
+            batch = []
+            batch_size = 0
+    f.write(''.join(batch))
+    return count + len(batch)
+
+def _strip_eol(line):
+    """Return line without its trailing line ending, whichever style it is."""
+    if line.endswith('\r\n'):
+        return line[:-2]
+    if line.endswith(('\n', '\r')):
+        return line[:-1]
+    return line
+
 def strip_prefix(filename):
     """Strip 'a/' or 'b/' from filename."""
-    return re.sub(r'^[ab]/', '', filename)
+    if filename[:2] in ('a/', 'b/'):
+        return filename[2:]
+    return filename
 
-def apply_hunks(original_lines, hunks, line_ending, verbose=False):
-    """Apply hunks to original lines, return patched content using specified line ending.
+def _hunk_start(hunk):
+    """Return the index of the first original line a hunk applies to.
+    
+    Raises ValueError if its header could not be parsed.
+    """
+    if 'old_start' not in hunk:
+        raise ValueError(f"Invalid hunk header: {hunk['header']}")
+    # old_start=0 means "before the first line" - used for empty files or insertions at start
+    return max(hunk['old_start'] - 1, 0)
+
+def _check_hunk_placement(start, old_count, cursor, line_count, offset=0):
+    """Raise ValueError unless a hunk replacing old_count lines from start can be applied.
+    
+    cursor is the first original line not yet consumed by earlier hunks and
+    line_count the length of the original file; offset (the net number of
+    lines earlier hunks added) only feeds into the messages.
+    """
+    index = start + offset
+    if start < cursor:
+        raise ValueError(f"Hunk cannot be applied: it starts at line {start + 1}, inside or before the previous hunk.")
+    if start > line_count:
+        raise ValueError(f"Hunk cannot be applied: index {index} is beyond end of file (file has {line_count + offset} lines).")
+    if old_count > 0 and start + old_count > line_count:
+        raise ValueError(f"Hunk cannot be applied: trying to remove {old_count} lines starting at {index}, but file only has {line_count + offset} lines.")
+
+def _to_line_ending(text, line_ending):
+    """Return patch text (normalized to \\n) with its trailing \\n replaced by line_ending."""
+    if line_ending != '\n' and text.endswith('\n'):
+        return text[:-1] + line_ending
+    return text
+
+def _hunk_trace(hunk):
+    """Return the verbose trace lines for a hunk's removed, added and context lines."""
+    trace = []
+    for line in hunk['lines']:
+        c = line[:1]
+        if c == '-':
+            trace.append(f"      - {line[1:].rstrip()}\n")
+        elif c == '+':
+            trace.append(f"      + {line[1:].rstrip()}\n")
+        elif c == ' ':
+            trace.append(f"        {line[1:].rstrip()}\n")
+    return trace
+
+def apply_hunks(original_lines, hunks, line_ending, verbose=False, line_count=None):
+    """Apply hunks to original lines, yielding the patched content using specified line ending.
     
     IMPORTANT: This function handles the case where patch and source files have
-    different line endings. All patch content (+ and context lines) is converted
-    to match the source file's line ending style, ensuring output consistency.
+    different line endings. Added lines are converted to match the source file's
+    line ending style, and context lines are copied from the source itself,
+    ensuring output consistency.
+    
+    The output is produced in a single forward pass: unchanged runs of original
+    lines between hunks are passed through and each hunk's new lines yielded,
+    so hunks must be in file order (as unified diffs always list them). Only
+    one hunk's worth of original lines is held at a time, so original_lines
+    can be an open file and the output written as it is generated.
     
     Args:
-        original_lines: List of lines from source file (with original line endings)
+        original_lines: Iterable of lines from source file (with original line endings)
         hunks: List of hunk dictionaries from patch (normalized to \\n)
         line_ending: Target line ending style detected from source file
         verbose: Whether to show detailed processing info
+        line_count: Number of lines in original_lines; needed when it is not a list
     """
-    patched = original_lines[:]
-    offset = 0  # Adjust for insertions/deletions
+    if line_count is None:
+        # A list is only read, never copied or modified; other iterables need listing to count
+        if not isinstance(original_lines, list):
+            original_lines = list(original_lines)
+        line_count = len(original_lines)
+    source = iter(original_lines)
+    emitted = 0  # Number of patched lines yielded so far
+    cursor = 0  # Index of the first original line not yet copied or replaced
+    # Patch lines already end in \n, so an LF source needs no conversion at all
+    convert_eol = line_ending != '\n'
     
     for hunk in hunks:
         header = hunk['header']
-        m = re.match(r'@@ -(\d+),?(\d*) \+(\d+),?(\d*) @@', header)
-        if not m:
-            raise ValueError(f"Invalid hunk header: {header}")
+        start = _hunk_start(hunk)
+        old_start = hunk['old_start']
+        old_count = hunk['old_count']
+        new_start = hunk['new_start']
+        new_count = hunk['new_count']
         
-        old_start = int(m.group(1))
-        old_count = int(m.group(2)) if m.group(2) else 1
-        new_start = int(m.group(3))
-        new_count = int(m.group(4)) if m.group(4) else 1
-        
-        # Handle special case: adding to empty file or at very beginning
-        if old_start == 0:
-            # This means "before the first line" - used for empty files or insertions at start
-            index = 0 + offset
-        else:
-            # Calculate the index in the current patched content
-            index = old_start - 1 + offset
+        # Where the hunk lands in the patched content, given earlier insertions/deletions
+        offset = emitted - cursor
+        index = start + offset
 
         if verbose:
-            print(f"    Applying hunk: {header.strip()}")
-            print(f"      Old: start={old_start}, count={old_count}")
-            print(f"      New: start={new_start}, count={new_count}")
-            print(f"      Applying at index {index} with offset {offset}")
-            print(f"      Using line ending: {repr(line_ending)}")
+            # Verbose lines are collected and written once up to validation and once
+            # for the rest of the hunk, rather than a print() per patch line
+            log = [
+                f"    Applying hunk: {header.strip()}\n",
+                f"      Old: start={old_start}, count={old_count}\n",
+                f"      New: start={new_start}, count={new_count}\n",
+                f"      Applying at index {index} with offset {offset}\n",
+                f"      Using line ending: {repr(line_ending)}\n",
+            ]
             if old_start == 0:
-                print(f"      Special case: old_start=0, treating as insertion at beginning")
-
-        # Build the new content for this region
-        # NOTE: All patch lines are normalized to \n, but we convert them 
+                log.append(f"      Special case: old_start=0, treating as insertion at beginning\n")
+            # The hunk's own lines are traced before it is validated, so a rejected
+            # hunk is still shown in full ahead of the error
+            log += _hunk_trace(hunk)
+            sys.stdout.write(''.join(log))
+            log.clear()
+
+        # Validate that we're applying the hunk at a valid location
+        _check_hunk_placement(start, old_count, cursor, line_count, offset)
+        
+        # Copy the untouched original lines up to the hunk
+        yield from itertools.islice(source, start - cursor)
+        emitted += start - cursor
+        hunk_output_start = emitted
+        # The original lines this hunk replaces
+        old_region = list(itertools.islice(source, old_count))
+
+        # Yield the new content for this region
+        # NOTE: All patch lines are normalized to \n, but we convert added lines
         # to match the source file's line ending style for consistent output
-        new_lines = []
+        src = 0  # Index in old_region of the next context or removed line
         for line in hunk['lines']:
-            if line.startswith('-'):
-                if verbose:
-                    print(f"      - {line[1:].rstrip()}")
+            if not line:
+                continue
+            c = line[0]
+            if c == '-':
                 # Skip removed lines - they won't be in the new content
-            elif line.startswith('+'):
+                src += 1
+            elif c == '+':
                 # Convert patch line ending to target line ending (source file's style)
                 patch_line = line[1:]  # Remove the '+'
-                if patch_line.endswith('\n'):
-                    # Replace \n with target line ending
-                    converted_line = patch_line[:-1] + line_ending
-                else:
-                    converted_line = patch_line
-                new_lines.append(converted_line)
-                if verbose:
-                    print(f"      + {patch_line.rstrip()}")
-            elif line.startswith(' '):
-                # Context lines should be included with target line ending (source file's style)
+                converted_line = _to_line_ending(patch_line, line_ending) if convert_eol else patch_line
+                emitted += 1
+                yield converted_line
+            elif c == ' ':
                 context_line = line[1:]  # Remove the ' '
-                if context_line.endswith('\n'):
-                    # Replace \n with target line ending
-                    converted_line = context_line[:-1] + line_ending
+                if src < old_count:
+                    # Copy the context line from the source: it already has the
+                    # right content and line ending, so nothing is rebuilt
+                    converted_line = old_region[src]
+                    if start + src == line_count - 1 and context_line.endswith('\n') and not converted_line.endswith(('\n', '\r')):
+                        # Source's last line has no newline. It still gets one whenever the
+                        # patch's context line does, even if it stays the last output line:
+                        # context lines used to be rebuilt from the patch text, and a
+                        # '\ No newline at end of file' marker is not honoured
+                        converted_line += line_ending
                 else:
-                    converted_line = context_line
-                new_lines.append(converted_line)
-                if verbose:
-                    print(f"        {context_line.rstrip()}")
+                    # Hunk has more lines than its header counts - fall back to the patch text
+                    converted_line = _to_line_ending(context_line, line_ending) if convert_eol else context_line
+                src += 1
+                emitted += 1
+                yield converted_line
         
-        # Validate that we're applying the hunk at a valid location  
-        if index < 0:
-            raise ValueError(f"Hunk cannot be applied: index {index} is negative.")
-        if index > len(patched):
-            raise ValueError(f"Hunk cannot be applied: index {index} is beyond end of file (file has {len(patched)} lines).")
-        if old_count > 0 and index + old_count > len(patched):
-            raise ValueError(f"Hunk cannot be applied: trying to remove {old_count} lines starting at {index}, but file only has {len(patched)} lines.")
-        
-        # Verify context lines match (basic sanity check)
-        context_matches = True
-        hunk_line_idx = 0
-        for i in range(old_count):
-            if index + i >= len(patched):
-                context_matches = False
-                break
-            
-            # Find corresponding line in hunk that should match this original line
-            while hunk_line_idx < len(hunk['lines']):
-                hunk_line = hunk['lines'][hunk_line_idx]
-                if hunk_line.startswith(' ') or hunk_line.startswith('-'):
-                    # This hunk line corresponds to an original line
-                    expected = hunk_line[1:]
-                    actual = patched[index + i]
-                    
-                    # Normalize both for comparison (ignore line ending differences)
-                    expected_normalized = normalize_line_endings(expected, '\n')
-                    actual_normalized = normalize_line_endings(actual, '\n')
-                    
-                    if expected_normalized != actual_normalized:
-                        if verbose:
-                            print(f"      Warning: Context mismatch at line {index + i + 1}")
-                            print(f"        Expected: {repr(expected_normalized.rstrip())}")
-                            print(f"        Actual:   {repr(actual_normalized.rstrip())}")
-                    hunk_line_idx += 1
-                    break
-                elif hunk_line.startswith('+'):
-                    # Skip + lines as they don't correspond to original lines
-                    hunk_line_idx += 1
-                else:
-                    hunk_line_idx += 1
-                    break
-            else:
-                break
-        
-        # Apply the replacement
+        # Verify context lines match (basic sanity check), ignoring line ending differences.
+        # A mismatch is only ever reported as a verbose warning, so skip it otherwise.
         if verbose:
-            print(f"      Replacing {old_count} lines at index {index} with {len(new_lines)} lines")
+            for i, (expected, actual) in enumerate(zip(hunk['old_lines'], old_region)):
+                if _strip_eol(expected) != _strip_eol(actual):
+                    log.append(f"      Warning: Context mismatch at line {start + i + 1}\n")
+                    log.append(f"        Expected: {repr(expected.rstrip())}\n")
+                    log.append(f"        Actual:   {repr(actual.rstrip())}\n")
         
-        patched[index:index + old_count] = new_lines
+        if verbose:
+            log.append(f"      Replacing {old_count} lines at index {index} with {emitted - hunk_output_start} lines\n")
+            sys.stdout.write(''.join(log))
         
-        # Update offset for next hunk
-        offset += len(new_lines) - old_count
+        # The original lines this hunk replaced have been consumed
+        cursor = start + old_count
     
-    return patched
-
-def main():
-    parser = argparse.ArgumentParser(description="Apply a unified diff and create numbered output files.")
-    parser.add_argument('patchfile', help='Path to the .diff or .patch file')
-    parser.add_argument('--dry-run', action='store_true', help='Show what would happen without making changes')
-    parser.add_argument('--verbose', action='store_true', help='Show detailed hunk processing information')
-    parser.add_argument('--base-dir', help='Base directory where original files are located (default: current directory)', default='.')
-    args = parser.parse_args()
+    # Copy the rest of the file after the last hunk
+    yield from source
 
-    base_dir = os.path.abspath(args.base_dir)
+def hunks_fit(hunks, line_count):
+    """Return whether apply_hunks() can apply hunks to a file of line_count lines without an error.
+    
+    This needs only the hunk headers, so it is checked before any output file
+    is created. It runs the same checks as apply_hunks(), minus the messages.
+    """
+    cursor = 0
+    try:
+        for hunk in hunks:
+            start = _hunk_start(hunk)
+            _check_hunk_placement(start, hunk['old_count'], cursor, line_count)
+            cursor = start + hunk['old_count']
+    except ValueError:
+        return False
+    return True
+
+def insertion_plan(hunks, line_ending, line_count, mixed):
+    """Plan a patch that only inserts lines at the start and/or end of the file.
+    
+    Such a patch leaves the source untouched, so the output is the source
+    copied byte for byte with the new lines written around it (see
+    write_insertions()) and the source is never split into lines. Returns
+    None when apply_hunks() is needed instead: hunks that remove or check
+    lines, insertions elsewhere, mixed line endings (which get normalized)
+    and anything apply_hunks() would report as an error. line_ending,
+    line_count and mixed describe the source, as from scan_line_endings().
+    Otherwise returns (head, tail): the converted lines to write before and
+    after the source.
+    """
+    if mixed or not hunks or not hunks_fit(hunks, line_count):
+        return None
+    if any(hunk['old_count'] or hunk['old_lines'] or _hunk_start(hunk) not in (0, line_count) for hunk in hunks):
+        return None
+    
+    head = []
+    tail = []
+    for hunk in hunks:
+        new_lines = head if _hunk_start(hunk) == 0 else tail
+        new_lines.extend(_to_line_ending(line[1:], line_ending) for line in hunk['lines'] if line[:1] == '+')
+    return head, tail
+
+def write_insertions(original_path, new_name, head, tail):
+    """Write new_name as the head lines, original_path's bytes unchanged, then the tail lines."""
+    with open(new_name, 'wb') as out:
+        out.write(''.join(head).encode('utf-8'))
+        with open(original_path, 'rb') as src:
+            shutil.copyfileobj(src, out, _IO_BLOCK_SIZE)
+        out.write(''.join(tail).encode('utf-8'))
+
+def source_lines(f, line_ending, mixed):
+    """Return the lines of the open original file f, normalized to line_ending if mixed."""
+    return lines_with_line_ending(f, line_ending) if mixed else f
+
+def patch_files(patchfile, base_dir='.', dry_run=False, verbose=False):
+    """Apply every file patch in patchfile to the originals under base_dir and print a summary.
+
+    This is the whole command line tool minus argument parsing, so it can
+    also be called directly from Python.
+    """
+    base_dir = os.path.abspath(base_dir)
 
-    patches = parse_patch(args.patchfile)
+    patches = parse_patch(patchfile)
 
     if not patches:
         print("No patches found in file.")
@@ -288,6 +522,7 @@ def main():
     total_patched = 0
     total_skipped = 0
     total_errors = 0
+    listings = {}  # Directory listings shared by file_exists() and next_numbered_filename() below
 
     for p in patches:
         old_file = strip_prefix(p['old'])
@@ -296,50 +531,71 @@ def main():
         original_path = os.path.join(base_dir, old_file)
         total_processed += 1
 
-        if not os.path.exists(original_path):
+        if not file_exists(original_path, listings):
             print(f"[SKIP] Original file '{original_path}' not found.")
             total_skipped += 1
             continue
 
         try:
-            # Read original file and detect its line ending style
-            with open(original_path, 'r', encoding='utf-8', newline='') as f:
-                original_content = f.read()
+            # Detect the original file's line ending style and count its lines.
+            # The lines themselves are copied or streamed through apply_hunks() by a second read.
+            line_ending, line_count, mixed = scan_line_endings(original_path)
             
-            line_ending = detect_line_ending(original_content)
-            original_lines = lines_with_preserved_endings(original_content, line_ending)
-
-            if args.verbose:
-                print(f"\n[PROCESSING] {original_path}")
-                print(f"  Original file has {len(original_lines)} lines")
-                print(f"  Detected source line ending: {repr(line_ending)}")
-                if 'patch_line_ending' in p:
-                    print(f"  Detected patch line ending: {repr(p['patch_line_ending'])}")
-                    if p['patch_line_ending'] != line_ending:
-                        print(f"  NOTE: Patch and source have different line endings - output will match source")
-
-            patched_lines = apply_hunks(original_lines, p['hunks'], line_ending, verbose=args.verbose)
-            
-            if args.verbose:
-                print(f"  Patched file has {len(patched_lines)} lines")
+            # Insertions at the start/end only need the source copied around them.
+            # Verbose runs always take apply_hunks() for its per-hunk report.
+            plan = None if verbose else insertion_plan(p['hunks'], line_ending, line_count, mixed)
+            if plan is not None:
+                head, tail = plan
+            else:
+                if verbose:
+                    print(f"\n[PROCESSING] {original_path}")
+                    print(f"  Original file has {line_count} lines")
+                    print(f"  Detected source line ending: {repr(line_ending)}")
+                    if 'patch_line_ending' in p:
+                        print(f"  Detected patch line ending: {repr(p['patch_line_ending'])}")
+                        if p['patch_line_ending'] != line_ending:
+                            print(f"  NOTE: Patch and source have different line endings - output will match source")
+
+                if dry_run or not hunks_fit(p['hunks'], line_count):
+                    # Nothing will be written: run through the hunks for the verbose report and any error
+                    with open_source(original_path) as f:
+                        patched_count = sum(1 for _ in apply_hunks(source_lines(f, line_ending, mixed), p['hunks'], line_ending, verbose=verbose, line_count=line_count))
+                    if verbose:
+                        print(f"  Patched file has {patched_count} lines")
                 
         except Exception as e:
             print(f"[ERROR] Failed to apply patch to '{original_path}': {e}")
             total_errors += 1
             continue
 
-        new_name = next_numbered_filename(original_path)
-        if args.dry_run:
+        new_name = next_numbered_filename(original_path, listings)
+        if dry_run:
             print(f"[DRY-RUN] Would create: {new_name} (from {original_path}) [line ending: {repr(line_ending)}]")
         else:
             try:
-                with open(new_name, 'w', encoding='utf-8', newline='') as f:
-                    f.writelines(patched_lines)
+                if plan is not None:
+                    write_insertions(original_path, new_name, head, tail)
+                else:
+                    with open_source(original_path) as src, open_output(new_name) as f:
+                        patched_lines = apply_hunks(source_lines(src, line_ending, mixed), p['hunks'], line_ending, verbose=verbose, line_count=line_count)
+                        patched_count = write_lines(f, patched_lines)
+                    if verbose:
+                        print(f"  Patched file has {patched_count} lines")
+                # A later patch in this run may target the file just written
+                directory, name = os.path.split(new_name)
+                if listings.get(os.path.normcase(directory)) is not None:
+                    listings[os.path.normcase(directory)].add(os.path.normcase(name))
                 print(f"[OK] Patched '{original_path}' -> '{new_name}' [line ending: {repr(line_ending)}]")
                 total_patched += 1
             except Exception as e:
                 print(f"[ERROR] Could not write '{new_name}': {e}")
                 total_errors += 1
+                # Don't leave a partly written output behind
+                if os.path.exists(new_name):
+                    try:
+                        os.remove(new_name)
+                    except OSError:
+                        pass
 
     # Summary
     print("\nSummary:")
@@ -348,5 +604,15 @@ def main():
     print(f"  Skipped:         {total_skipped}")
     print(f"  Errors:          {total_errors}")
 
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Apply a unified diff and create numbered output files.")
+    parser.add_argument('patchfile', help='Path to the .diff or .patch file')
+    parser.add_argument('--dry-run', action='store_true', help='Show what would happen without making changes')
+    parser.add_argument('--verbose', action='store_true', help='Show detailed hunk processing information')
+    parser.add_argument('--base-dir', help='Base directory where original files are located (default: current directory)', default='.')
+    args = parser.parse_args(argv)
+
+    patch_files(args.patchfile, base_dir=args.base_dir, dry_run=args.dry_run, verbose=args.verbose)
+
 if __name__ == '__main__':
     main()
\ No newline at end of file